@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+OTP/CAPTCHA providers for bank recordings.
+A provider waits for a code (terminal, watched file/FIFO, or localhost webhook)
+and returns it as soon as it arrives, or None on timeout.
+"""
+
+import json
+import os
+import re
+import select
+import stat
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+DEFAULT_TIMEOUT = 180
+
+# 6-digit OTP in a forwarded SMS, which can also contain amounts. Prefer the number tied
+# to "OTP" wording; only fall back to a bare number when no amount is mentioned.
+SMS_OTP_PATTERNS = [
+    r"(?i)(?:OTP|one[- ]time password)(?:\W+(?:is|code))*\W*(\d{6})\b",
+    r"(?i)(?:OTP|one[- ]time password)\b.{0,60}?\bis\W+(\d{6})\b",
+    r"(?i)\b(\d{6})\W+(?:is\W+)?(?:your\W+)?(?:\w+\W+)?(?:OTP|one[- ]time password)",
+    r"(?is)^(?!.*(?:\bRs\b|\bINR\b|₹)).*?\b(\d{6})\b",
+]
+
+
+def extract_code(text, pattern=None):
+    """
+    Pull the code out of raw text (e.g. a forwarded SMS). Returns None if not found.
+    `pattern` may be a list of regexes, tried in order (most specific first).
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    if not pattern:
+        return text
+    patterns = [pattern] if isinstance(pattern, str) else pattern
+    for regex in patterns:
+        match = re.search(regex, text)
+        if match:
+            return match.group(1) if match.groups() else match.group(0)
+    return None
+
+
+class TerminalProvider:
+    """Prompt at the terminal. Blank input means the code was typed in the browser."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def wait_for_code(self, prompt, pattern=None):
+        print(f"\n>>> {prompt} (type it here, or in browser and press Enter)...")
+        ready, _, _ = select.select([sys.stdin], [], [], self.timeout)
+        if not ready:
+            return None
+        line = sys.stdin.readline()
+        # Blank is still an answer: caller submits whatever is in the browser
+        return extract_code(line, pattern) or ""
+
+
+class FileProvider:
+    """Watch a local file or FIFO. The file is consumed (deleted) once read."""
+
+    def __init__(self, path, timeout=DEFAULT_TIMEOUT, poll_interval=0.2):
+        self.path = Path(path).expanduser()
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def wait_for_code(self, prompt, pattern=None):
+        print(f"\n>>> {prompt}: waiting for {self.path} (timeout {self.timeout}s)...")
+        deadline = time.monotonic() + self.timeout
+        if self.path.exists() and stat.S_ISFIFO(self.path.stat().st_mode):
+            return self._read_fifo(deadline, pattern)
+
+        # Drop stale codes from an earlier run
+        if self.path.exists():
+            self.path.unlink()
+
+        while time.monotonic() < deadline:
+            if self.path.exists():
+                code = extract_code(self.path.read_text(), pattern)
+                if code:
+                    self.path.unlink()
+                    return code
+            time.sleep(self.poll_interval)
+        return None
+
+    def _read_fifo(self, deadline, pattern):
+        fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        buf = b""
+        try:
+            while time.monotonic() < deadline:
+                ready, _, _ = select.select([fd], [], [], max(0, deadline - time.monotonic()))
+                if not ready:
+                    break
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    # No writer connected yet (or writer closed): keep waiting
+                    time.sleep(self.poll_interval)
+                    continue
+                buf += chunk
+                code = extract_code(buf.decode(errors="ignore"), pattern)
+                if code:
+                    return code
+        finally:
+            os.close(fd)
+        return None
+
+
+class WebhookProvider:
+    """
+    Listen on localhost for a POST from an SMS forwarder.
+    Accepts plain text, JSON ({"code": ...}, {"otp": ...}, {"message": ...}) or form data.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, timeout=DEFAULT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def wait_for_code(self, prompt, pattern=None):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode(errors="ignore")
+                code = extract_code(_body_text(body, self.headers.get("Content-Type", "")), pattern)
+                if code:
+                    received.append(code)
+                self.send_response(200 if code else 422)
+                self.end_headers()
+                self.wfile.write(b"ok\n" if code else b"no code found\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        print(f"\n>>> {prompt}: waiting for POST on http://{self.host}:{self.port}/ (timeout {self.timeout}s)...")
+        deadline = time.monotonic() + self.timeout
+        with HTTPServer((self.host, self.port), Handler) as server:
+            while not received and time.monotonic() < deadline:
+                server.timeout = max(0.1, deadline - time.monotonic())
+                server.handle_request()
+        return received[0] if received else None
+
+
+def _body_text(body, content_type):
+    """Get the text that carries the code from a webhook request body."""
+    if "json" in content_type:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return body
+        if isinstance(payload, dict):
+            for key in ("code", "otp", "message", "text", "body"):
+                if payload.get(key):
+                    return str(payload[key])
+        return body
+    if "form" in content_type:
+        fields = parse_qs(body)
+        for key in ("code", "otp", "message", "text", "body"):
+            if fields.get(key):
+                return fields[key][0]
+    return body
+
+
+def get_provider(otp_config=None):
+    """
+    Build a provider from a bank's "otp" config block.
+    Recordings get it via the OTP_CONFIG env var set by run.py.
+    """
+    if otp_config is None:
+        otp_config = json.loads(os.environ.get("OTP_CONFIG") or "{}")
+
+    kind = otp_config.get("provider", "terminal")
+    timeout = otp_config.get("timeout", DEFAULT_TIMEOUT)
+
+    if kind == "terminal":
+        return TerminalProvider(timeout=timeout)
+    if kind == "file":
+        return FileProvider(otp_config["path"], timeout=timeout)
+    if kind == "webhook":
+        return WebhookProvider(
+            host=otp_config.get("host", "127.0.0.1"),
+            port=otp_config.get("port", 8765),
+            timeout=timeout,
+        )
+    raise ValueError(f"Unknown OTP provider: {kind}")
+
+
+def wait_for_code(prompt, pattern=None, provider=None):
+    """Wait on the configured provider. Returns (code, seconds waited); code is None on timeout."""
+    provider = provider or get_provider()
+    start = time.monotonic()
+    code = provider.wait_for_code(prompt, pattern)
+    return code, round(time.monotonic() - start, 1)
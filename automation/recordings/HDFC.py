@@ -2,10 +2,15 @@
 """HDFC Bank - Mummyji Account (Savings + Current)"""
 
 import os
+import sys
 import json
 import re
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from otp_providers import SMS_OTP_PATTERNS, TerminalProvider, get_provider, wait_for_code
+from snapshots import save_snapshot
+
 def log(msg):
     print(f"[HDFC] {msg}")
 
@@ -33,6 +38,84 @@ def try_click(page, locator, description, timeout=5000):
         log(f"Skipped: {description} (not found)")
         return False
 
+def fill_otp(page, otp):
+    """Type the OTP into the OTP field (or one-digit-per-box fields). Returns False if not found."""
+    boxes = page.get_by_role("textbox", name=re.compile("OTP", re.I)).or_(
+        page.locator("input[autocomplete='one-time-code']"))
+    try:
+        boxes.first.wait_for(timeout=5000)
+        fields = boxes.all()
+        if len(fields) >= len(otp):
+            for field, digit in zip(fields, otp):
+                field.fill(digit, timeout=2000)
+        else:
+            fields[0].fill(otp, timeout=2000)
+        return True
+    except PlaywrightTimeout:
+        return False
+
+def extract_accounts(page):
+    """Parse Savings/Current tiles on the Accounts page"""
+    accounts = []
+    
+    # Try multiple account tiles first (desktop view only)
+    tiles = page.locator("bb-multiple-account-product-tile-ui .desktop-view").all()
+    
+    # If no multiple tiles, try single account view
+    if not tiles:
+        tiles = page.locator(".bb-product-kind").all()
+    
+    for tile in tiles:
+        try:
+            text = tile.inner_text()
+            
+            # Determine account type
+            if "Savings A/c" in text:
+                acc_type = "Savings"
+            elif "Current A/c" in text:
+                acc_type = "Current"
+            else:
+                continue
+            
+            # Get account number (last 4 digits) - try both structures
+            acc_num = ""
+            acc_spans = tile.locator("bb-common-mask-account-number span").all()
+            for span in acc_spans:
+                span_text = span.inner_text().strip()
+                if "**" in span_text and any(c.isdigit() for c in span_text):
+                    acc_num = span_text.replace("*", "").replace(" ", "")
+                    break
+            
+            # Get balance from .integer span (first one is the main balance)
+            balance_el = tile.locator(".integer").first
+            balance = parse_amount(balance_el.inner_text())
+            
+            accounts.append({"type": acc_type, "account_number": acc_num, "balance": balance, "fds": []})
+            log(f"  {acc_type} ({acc_num}): ₹{balance:,}")
+        except Exception as e:
+            log(f"  Error parsing tile: {e}")
+    
+    return accounts
+
+def extract_fds(page):
+    """Parse principal + maturity date from the Fixed Deposit page text"""
+    fds = []
+    try:
+        fd_text = page.inner_text("body")
+        fd_matches = re.findall(r'₹([\d,]+\.?\d*)[^₹]*?Matures on (\d+ \w+ \d+)', fd_text)
+        for principal_str, maturity_str in fd_matches:
+            fds.append({
+                "principal": parse_amount(principal_str),
+                "maturity_date": parse_date(maturity_str)
+            })
+            log(f"  FD: ₹{parse_amount(principal_str):,} -> {parse_date(maturity_str)}")
+    except Exception as e:
+        log(f"  Could not extract FDs: {e}")
+    return fds
+
+# Page name -> extractor, used by replay.py against saved snapshots
+EXTRACTORS = {"accounts": extract_accounts, "fds": extract_fds}
+
 def run():
     username = os.environ.get("BANK_USERNAME", "")
     password = os.environ.get("BANK_PASSWORD", "")
@@ -76,141 +159,112 @@ def run():
         if not browser:
             raise RuntimeError("Could not launch Chrome on any port (9333-9342)")
         
-        context = browser.contexts[0]
-        page = context.pages[0] if context.pages else context.new_page()
+        # Always shut Chrome down - it stays logged in to the bank otherwise
+        try:
+            context = browser.contexts[0]
+            page = context.pages[0] if context.pages else context.new_page()
 
-        # Login
-        log("Opening HDFC NetBanking...")
-        page.goto("https://now.hdfc.bank.in/")
-        
-        log("Entering credentials...")
-        page.get_by_role("textbox", name="Enter Customer ID/User ID").fill(username)
-        page.wait_for_timeout(500)
-        page.get_by_role("textbox", name="Enter Password").fill(password)
-        page.wait_for_timeout(1000)
-        page.get_by_role("button", name="Login", exact=True).click()
-        
-        page.wait_for_timeout(2000)
-        
-        # Handle "Proceed Here" popup if session exists elsewhere
-        try_click(page, page.get_by_role("button", name="Proceed Here"), "Proceed Here popup", timeout=3000)
-        
-        page.wait_for_timeout(2000)
-        
-        # OTP - only if OTP page appears
-        otp_radio = page.get_by_role("radio", name=re.compile("SMS Mobile number")).nth(1)
-        if otp_radio.count() > 0:
-            log("OTP page detected")
-            otp_radio.check()
-            page.get_by_role("button", name="Get OTP").click()
-            print("\n>>> Enter OTP in browser, then press Enter here...")
-            input()
-            page.get_by_role("button", name="Submit").click()
+            # Login
+            log("Opening HDFC NetBanking...")
+            page.goto("https://now.hdfc.bank.in/")
+            
+            log("Entering credentials...")
+            page.get_by_role("textbox", name="Enter Customer ID/User ID").fill(username)
+            page.wait_for_timeout(500)
+            page.get_by_role("textbox", name="Enter Password").fill(password)
+            page.wait_for_timeout(1000)
+            page.get_by_role("button", name="Login", exact=True).click()
+            
             page.wait_for_timeout(2000)
-        else:
-            log("No OTP required, continuing...")
-        
-        page.wait_for_timeout(2000)
-        
-        # Handle "Proceed Here" popup if session exists elsewhere
-        try_click(page, page.get_by_role("button", name="Proceed Here"), "Proceed Here popup", timeout=3000)
-        
-        # Handle popups
-        for _ in range(3):
-            try_click(page, page.get_by_role("button", name="Do It Later"), "Dismiss popup")
-        
-        # Toggle if needed
-        try_click(page, page.locator(".bb-switch__slider"), "Toggle switch", timeout=2000)
-        
-        # Navigate to Accounts
-        log("Navigating to Accounts...")
-        page.get_by_role("link", name="Accounts").click()
-        page.wait_for_timeout(3000)
-        
-        # Extract accounts
-        accounts = []
-        log("Extracting account balances...")
-        
-        # Try multiple account tiles first (desktop view only)
-        tiles = page.locator("bb-multiple-account-product-tile-ui .desktop-view").all()
-        
-        # If no multiple tiles, try single account view
-        if not tiles:
-            tiles = page.locator(".bb-product-kind").all()
-        
-        for tile in tiles:
-            try:
-                text = tile.inner_text()
-                
-                # Determine account type
-                if "Savings A/c" in text:
-                    acc_type = "Savings"
-                elif "Current A/c" in text:
-                    acc_type = "Current"
-                else:
-                    continue
-                
-                # Get account number (last 4 digits) - try both structures
-                acc_num = ""
-                acc_spans = tile.locator("bb-common-mask-account-number span").all()
-                for span in acc_spans:
-                    span_text = span.inner_text().strip()
-                    if "**" in span_text and any(c.isdigit() for c in span_text):
-                        acc_num = span_text.replace("*", "").replace(" ", "")
+            
+            # Handle "Proceed Here" popup if session exists elsewhere
+            try_click(page, page.get_by_role("button", name="Proceed Here"), "Proceed Here popup", timeout=3000)
+            
+            page.wait_for_timeout(2000)
+            
+            # OTP - only if OTP page appears
+            otp_wait_seconds = 0
+            otp_radio = page.get_by_role("radio", name=re.compile("SMS Mobile number")).nth(1)
+            if otp_radio.count() > 0:
+                log("OTP page detected")
+                otp_radio.check()
+                page.get_by_role("button", name="Get OTP").click()
+                otp, otp_wait_seconds = wait_for_code("Enter HDFC OTP", pattern=SMS_OTP_PATTERNS)
+                if otp is None:
+                    raise RuntimeError(f"Timed out waiting for OTP after {otp_wait_seconds}s")
+                log(f"OTP received after {otp_wait_seconds}s")
+                # Blank means it was typed in the browser already
+                if otp and not fill_otp(page, otp):
+                    log("OTP field not found")
+                    # Same timeout as the bank's configured OTP provider
+                    typed, typed_wait = wait_for_code(f"Type OTP {otp} in the browser",
+                                                      provider=TerminalProvider(timeout=get_provider().timeout))
+                    otp_wait_seconds += typed_wait
+                    if typed is None:
+                        raise RuntimeError(f"Timed out waiting for OTP to be typed in the browser after {typed_wait}s")
+                page.get_by_role("button", name="Submit").click()
+                page.wait_for_timeout(2000)
+            else:
+                log("No OTP required, continuing...")
+            
+            page.wait_for_timeout(2000)
+            
+            # Handle "Proceed Here" popup if session exists elsewhere
+            try_click(page, page.get_by_role("button", name="Proceed Here"), "Proceed Here popup", timeout=3000)
+            
+            # Handle popups
+            for _ in range(3):
+                try_click(page, page.get_by_role("button", name="Do It Later"), "Dismiss popup")
+            
+            # Toggle if needed
+            try_click(page, page.locator(".bb-switch__slider"), "Toggle switch", timeout=2000)
+            
+            # Navigate to Accounts
+            log("Navigating to Accounts...")
+            page.get_by_role("link", name="Accounts").click()
+            page.wait_for_timeout(3000)
+            
+            # Extract accounts
+            log("Extracting account balances...")
+            accounts = extract_accounts(page)
+            save_snapshot(page, "HDFC", "accounts", extract_accounts, accounts)
+            
+            # Navigate to FD page
+            log("Navigating to Fixed Deposits...")
+            try_click(page, page.get_by_role("button", name="FD/RD"), "FD/RD button")
+            page.wait_for_timeout(1000)
+            try_click(page, page.get_by_role("link", name="Fixed Deposit"), "Fixed Deposit link")
+            page.wait_for_timeout(10000)
+            
+            # Extract FDs
+            log("Extracting FD details...")
+            fds = extract_fds(page)
+            save_snapshot(page, "HDFC", "fds", extract_fds, fds)
+            
+            # Attach FDs to savings account
+            if accounts and fds:
+                for acc in accounts:
+                    if acc["type"] == "Savings":
+                        acc["fds"] = fds
                         break
-                
-                # Get balance from .integer span (first one is the main balance)
-                balance_el = tile.locator(".integer").first
-                balance = parse_amount(balance_el.inner_text())
-                
-                accounts.append({"type": acc_type, "account_number": acc_num, "balance": balance, "fds": []})
-                log(f"  {acc_type} ({acc_num}): ₹{balance:,}")
-            except Exception as e:
-                log(f"  Error parsing tile: {e}")
-        
-        # Navigate to FD page
-        log("Navigating to Fixed Deposits...")
-        try_click(page, page.get_by_role("button", name="FD/RD"), "FD/RD button")
-        page.wait_for_timeout(1000)
-        try_click(page, page.get_by_role("link", name="Fixed Deposit"), "Fixed Deposit link")
-        page.wait_for_timeout(10000)
-        
-        # Extract FDs
-        fds = []
-        log("Extracting FD details...")
-        try:
-            fd_text = page.inner_text("body")
-            fd_matches = re.findall(r'₹([\d,]+\.?\d*)[^₹]*?Matures on (\d+ \w+ \d+)', fd_text)
-            for principal_str, maturity_str in fd_matches:
-                fds.append({
-                    "principal": parse_amount(principal_str),
-                    "maturity_date": parse_date(maturity_str)
-                })
-                log(f"  FD: ₹{parse_amount(principal_str):,} -> {parse_date(maturity_str)}")
-        except Exception as e:
-            log(f"  Could not extract FDs: {e}")
-        
-        # Attach FDs to savings account
-        if accounts and fds:
-            for acc in accounts:
-                if acc["type"] == "Savings":
-                    acc["fds"] = fds
-                    break
-        
-        result = {"accounts": accounts}
-        
-        with open(output_file, "w") as f:
-            json.dump(result, f, indent=2)
-        
-        log(f"Done! Extracted {len(accounts)} accounts, {len(fds)} FDs")
-        
-        # Logout
-        log("Logging out...")
-        try_click(page, page.get_by_role("button", name="Logout"), "Logout button")
-        try_click(page, page.get_by_role("button", name="Logout"), "Confirm logout", timeout=2000)
-        
-        browser.close()
-        chrome_proc.terminate()
+            
+            result = {"accounts": accounts, "otp_wait_seconds": otp_wait_seconds}
+            
+            with open(output_file, "w") as f:
+                json.dump(result, f, indent=2)
+            
+            log(f"Done! Extracted {len(accounts)} accounts, {len(fds)} FDs")
+            
+            # Logout
+            log("Logging out...")
+            try_click(page, page.get_by_role("button", name="Logout"), "Logout button")
+            try_click(page, page.get_by_role("button", name="Logout"), "Confirm logout", timeout=2000)
+        finally:
+            try:
+                browser.close()
+            except Exception:
+                pass
+            chrome_proc.terminate()
 
 if __name__ == "__main__":
     run()
@@ -2,10 +2,15 @@
 """PNB Bank - Papaji Account (Savings + Term Deposit)"""
 
 import os
+import sys
 import json
 import re
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from otp_providers import wait_for_code
+from snapshots import save_snapshot
+
 def log(msg):
     print(f"[PNB] {msg}")
 
@@ -34,6 +39,59 @@ def try_click(page, locator, description, timeout=5000):
         log(f"Skipped: {description} (not found)")
         return False
 
+def extract_summary(page):
+    """Parse the Account Summary table into accounts and Term Deposits (maturity filled in later)"""
+    accounts = []
+    fds = []
+    
+    # Find all rows in the summary table
+    rows = page.locator("#SummaryList tr.listwhiterow, #SummaryList tr.listgreyrow").all()
+    
+    for i, row in enumerate(rows):
+        try:
+            # Get account number from menuPullDownHead or span
+            acc_num_el = row.locator(".menuPullDownHead").first
+            if acc_num_el.count():
+                acc_num = acc_num_el.inner_text().strip().split()[0]
+            else:
+                acc_num = row.locator(f"#HREF_AccountSummaryFG\\.ACCOUNT_DISPLAY_NAME_ARRAY\\[{i}\\]").inner_text().strip()
+            
+            # Get account type
+            acc_type = row.locator(f"#AccountSummaryFG\\.ACCOUNT_TYPE_ARRAY\\[{i}\\]").inner_text().strip()
+            
+            # Get balance
+            balance_text = row.locator(f"#HREF_AccountSummaryFG\\.BALANCE_ARRAY\\[{i}\\]").inner_text().strip()
+            balance = parse_amount(balance_text)
+            
+            if acc_type == "Term Deposit":
+                fds.append({
+                    "principal": balance,
+                    "maturity_date": "",
+                    "_row_index": i
+                })
+                log(f"  Term Deposit: ₹{balance:,}")
+            else:
+                accounts.append({
+                    "type": acc_type,
+                    "account_number": acc_num,
+                    "balance": balance,
+                    "fds": []
+                })
+                log(f"  {acc_type} ({acc_num}): ₹{balance:,}")
+                
+        except Exception as e:
+            log(f"  Error parsing row {i}: {e}")
+    
+    return {"accounts": accounts, "fds": fds}
+
+def extract_maturity_date(page):
+    """Read the maturity date from a Term Deposit details page"""
+    maturity_text = page.locator("#HREF_maturityDateOutput").inner_text().strip()
+    return parse_date(maturity_text)
+
+# Page name -> extractor, used by replay.py against saved snapshots
+EXTRACTORS = {"summary": extract_summary, "fd_detail": extract_maturity_date}
+
 def run():
     username = os.environ.get("BANK_USERNAME", "")
     password = os.environ.get("BANK_PASSWORD", "")
@@ -65,11 +123,17 @@ def run():
         log("Entering Password...")
         page.get_by_label("Password:*").fill(password)
         
-        # Step 3: Focus captcha field and wait for user to enter
+        # Step 3: Focus captcha field and wait for the code from the OTP provider
         log("Waiting for CAPTCHA...")
-        page.locator("#AuthenticationFG\\.ENTERED_CAPTCHA_CODE").focus()
-        print("\n>>> Enter CAPTCHA in browser, then press Enter here...")
-        input()
+        captcha_field = page.locator("#AuthenticationFG\\.ENTERED_CAPTCHA_CODE")
+        captcha_field.focus()
+        captcha, otp_wait_seconds = wait_for_code("Enter PNB CAPTCHA")
+        if captcha is None:
+            raise RuntimeError(f"Timed out waiting for CAPTCHA after {otp_wait_seconds}s")
+        log(f"CAPTCHA received after {otp_wait_seconds}s")
+        # Blank means it was typed in the browser already
+        if captcha:
+            captcha_field.fill(captcha)
         
         # Step 4: Click Log In
         log("Clicking Log In...")
@@ -91,47 +155,9 @@ def run():
         # Step 7: Extract account data from table
         log("Extracting account data...")
         
-        accounts = []
-        fds = []
-        fd_indices = []  # Track which rows are Term Deposits
-        
-        # Find all rows in the summary table
-        rows = page.locator("#SummaryList tr.listwhiterow, #SummaryList tr.listgreyrow").all()
-        
-        for i, row in enumerate(rows):
-            try:
-                # Get account number from menuPullDownHead or span
-                acc_num_el = row.locator(".menuPullDownHead").first
-                if acc_num_el.count():
-                    acc_num = acc_num_el.inner_text().strip().split()[0]
-                else:
-                    acc_num = row.locator(f"#HREF_AccountSummaryFG\\.ACCOUNT_DISPLAY_NAME_ARRAY\\[{i}\\]").inner_text().strip()
-                
-                # Get account type
-                acc_type = row.locator(f"#AccountSummaryFG\\.ACCOUNT_TYPE_ARRAY\\[{i}\\]").inner_text().strip()
-                
-                # Get balance
-                balance_text = row.locator(f"#HREF_AccountSummaryFG\\.BALANCE_ARRAY\\[{i}\\]").inner_text().strip()
-                balance = parse_amount(balance_text)
-                
-                if acc_type == "Term Deposit":
-                    fds.append({
-                        "principal": balance,
-                        "maturity_date": "",
-                        "_row_index": i
-                    })
-                    log(f"  Term Deposit: ₹{balance:,}")
-                else:
-                    accounts.append({
-                        "type": acc_type,
-                        "account_number": acc_num,
-                        "balance": balance,
-                        "fds": []
-                    })
-                    log(f"  {acc_type} ({acc_num}): ₹{balance:,}")
-                    
-            except Exception as e:
-                log(f"  Error parsing row {i}: {e}")
+        summary = extract_summary(page)
+        save_snapshot(page, "PNB", "summary", extract_summary, summary)
+        accounts, fds = summary["accounts"], summary["fds"]
         
         # Get maturity dates by clicking into each Term Deposit
         for fd in fds:
@@ -144,8 +170,8 @@ def run():
                 page.wait_for_timeout(2000)
                 
                 # Extract maturity date from details page
-                maturity_text = page.locator("#HREF_maturityDateOutput").inner_text().strip()
-                fd["maturity_date"] = parse_date(maturity_text)
+                fd["maturity_date"] = extract_maturity_date(page)
+                save_snapshot(page, "PNB", f"fd_detail_{row_idx}", extract_maturity_date, fd["maturity_date"])
                 log(f"  Maturity: {fd['maturity_date']}")
                 
                 # Go back to summary
@@ -162,7 +188,7 @@ def run():
         if accounts and fds:
             accounts[0]["fds"] = fds
         
-        result = {"accounts": accounts}
+        result = {"accounts": accounts, "otp_wait_seconds": otp_wait_seconds}
         
         with open(output_file, "w") as f:
             json.dump(result, f, indent=2)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Replay saved DOM snapshots through the recordings' extractors - no bank login needed.
+Checks each page against expected.json and reports extraction latency.
+
+Usage: python replay.py [--runs 200] [--update] [bank_id ...]
+"""
+
+import argparse
+import importlib.util
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from playwright.sync_api import sync_playwright
+
+from snapshots import SNAPSHOT_DIR, open_replay_page, run_extractor
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+
+
+def load_recording(bank_name):
+    """Import recordings/<bank_name>.py as a module (its run() isn't called)."""
+    spec = importlib.util.spec_from_file_location(f"recording_{bank_name}", RECORDINGS_DIR / f"{bank_name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_extractor(module, page_name):
+    # fd_detail_3 -> fd_detail
+    return module.EXTRACTORS.get(page_name) or module.EXTRACTORS.get(re.sub(r"_\d+$", "", page_name))
+
+
+def time_extractor(extractor, page, runs):
+    """Run the extractor `runs` times, returning (last result, per-run latencies in ms)."""
+    latencies = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_extractor(extractor, page)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, latencies
+
+
+def replay_snapshot(snapshot_dir, page, runs, update=False):
+    """Replay every page in one snapshot dir. Returns True if all results match."""
+    expected_file = snapshot_dir / "expected.json"
+    if not expected_file.exists():
+        print(f"=== {snapshot_dir.name} ===\n  No expected.json, skipped\n")
+        return False
+    with open(expected_file, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    module = load_recording(expected["bank"])
+    print(f"=== {snapshot_dir.name} ({expected['bank']}) ===")
+
+    ok = True
+    for html_file in sorted(snapshot_dir.glob("*.html")):
+        page_name = html_file.stem
+        extractor = get_extractor(module, page_name)
+        if not extractor:
+            print(f"  {page_name}: no extractor in {expected['bank']}.EXTRACTORS, skipped")
+            continue
+
+        try:
+            page.set_content(html_file.read_text(encoding="utf-8"))
+            result, latencies = time_extractor(extractor, page, 1)
+            # Only benchmark extractors that still work - a broken one can be slow on every run
+            if runs > 1 and (update or result == expected["pages"].get(page_name)):
+                result, more_latencies = time_extractor(extractor, page, runs - 1)
+                latencies += more_latencies
+        except Exception as e:
+            # Typically a selector that no longer matches the snapshot
+            print(f"  {page_name}: ERROR  {type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}")
+            ok = False
+            continue
+
+        if update:
+            expected["pages"][page_name] = result
+            status = "UPDATED"
+        elif page_name not in expected["pages"]:
+            status = "NO EXPECTED"
+            ok = False
+        elif result == expected["pages"][page_name]:
+            status = "OK"
+        else:
+            status = "MISMATCH"
+            ok = False
+
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"  {page_name}: {status}  mean {statistics.mean(latencies):.2f}ms  "
+              f"p95 {p95:.2f}ms  ({len(latencies)} runs)")
+        if status == "MISMATCH":
+            print(f"    expected: {json.dumps(expected['pages'][page_name])}")
+            print(f"    got:      {json.dumps(result)}")
+
+    if update:
+        with open(expected_file, "w", encoding="utf-8") as f:
+            json.dump(expected, f, indent=2)
+    print()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay bank page snapshots through the extractors")
+    parser.add_argument("bank_ids", nargs="*", help="Snapshot dirs to replay (default: all)")
+    parser.add_argument("--runs", type=int, default=200, help="Extractions per page (default: 200)")
+    parser.add_argument("--update", action="store_true", help="Rewrite expected.json from current results")
+    parser.add_argument("--dir", type=Path, default=SNAPSHOT_DIR, help="Snapshot root directory")
+    args = parser.parse_args()
+
+    if args.bank_ids:
+        snapshot_dirs = [args.dir / bank_id for bank_id in args.bank_ids]
+    else:
+        snapshot_dirs = sorted(d for d in args.dir.glob("*") if (d / "expected.json").exists())
+
+    if not snapshot_dirs:
+        print(f"No snapshots found in {args.dir}. Run: python run.py --snapshot")
+        sys.exit(1)
+
+    all_ok = True
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = open_replay_page(browser.new_context())
+        for snapshot_dir in snapshot_dirs:
+            all_ok = replay_snapshot(snapshot_dir, page, args.runs, args.update) and all_ok
+        browser.close()
+
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
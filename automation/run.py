@@ -4,14 +4,34 @@ Bank Balance Automation - Main Runner
 Reads bank credentials, runs recorded scripts, collects balances, updates BankrollTracker.
 """
 
+import argparse
 import json
 import os
+import re
 import sys
 from datetime import date
 from pathlib import Path
-from supabase import create_client
+from snapshots import SNAPSHOT_DIR
 
 OUTPUT_DIR = Path(__file__).parent / "output"
+EXPORT_DIR = Path(__file__).parent / "export"
+# --since with no date: export what changed since the last watermark
+SINCE_WATERMARK = "watermark"
+
+# Same nested shape the web client fetches, one page of days at a time
+EXPORT_SELECT = """
+    record_date,
+    accounts (
+        holder_name,
+        bank_name,
+        account_number,
+        balance,
+        fixed_deposits (
+            principal,
+            maturity_date
+        )
+    )
+"""
 
 
 def load_config():
@@ -47,9 +67,10 @@ def save_today_data(data):
     print(f"Saved to {get_today_output_file()}")
 
 
-def run_bank_script(bank_config):
+def run_bank_script(bank_config, snapshot=False):
     """
     Run the bank script based on bank name.
+    With snapshot=True the script also saves sanitised page HTML for replay.py.
     """
     bank_name = bank_config["name"]
     recording_file = Path(__file__).parent / "recordings" / f"{bank_name}.py"
@@ -67,6 +88,9 @@ def run_bank_script(bank_config):
     env["BANK_PASSWORD"] = bank_config["password"]
     env["BANK_ID"] = bank_config["id"]
     env["OUTPUT_FILE"] = str(temp_output)
+    env["OTP_CONFIG"] = json.dumps(bank_config.get("otp", {}))
+    if snapshot:
+        env["SNAPSHOT_DIR"] = str(SNAPSHOT_DIR)
     
     import subprocess
     result = subprocess.run(
@@ -87,8 +111,8 @@ def run_bank_script(bank_config):
     return None
 
 
-def upload_to_supabase(config, data):
-    """Upload collected data to Supabase (BankrollTracker backend)."""
+def sign_in_supabase(config):
+    """Sign in to Supabase as the BankrollTracker user. Returns (client, user_id)."""
     from supabase import create_client, Client
     
     client: Client = create_client(config["supabase_url"], config["supabase_key"])
@@ -108,7 +132,12 @@ def upload_to_supabase(config, data):
         print(f"Auth error: {e}")
         print(f"Password length: {len(password)}, first/last char: {password[0]}...{password[-1]}")
         raise
-    user_id = auth_response.user.id
+    return client, auth_response.user.id
+
+
+def upload_to_supabase(config, data):
+    """Upload collected data to Supabase (BankrollTracker backend)."""
+    client, user_id = sign_in_supabase(config)
     
     date_str = data["date"]
     
@@ -151,18 +180,229 @@ def upload_to_supabase(config, data):
     print(f"Uploaded {len(data['accounts'])} accounts to BankrollTracker")
 
 
+def to_daily_data(record):
+    """Convert a daily_records row (with nested accounts/FDs) to the output/ daily format."""
+    return {
+        "date": record["record_date"],
+        "accounts": [
+            {
+                "holder_name": acc["holder_name"],
+                "bank_name": acc["bank_name"],
+                "account_number": acc["account_number"],
+                "balance": acc["balance"],
+                "fds": [
+                    {"principal": fd["principal"], "maturity_date": fd["maturity_date"]}
+                    for fd in acc.get("fixed_deposits", [])
+                ]
+            }
+            for acc in record.get("accounts", [])
+        ]
+    }
+
+
+def iter_daily_records(client, user_id, since=None, modified_after=None, page_size=100):
+    """
+    Yield pages of daily_records from `since` (inclusive) in record_date order, using
+    keyset pagination (record_date > last seen) so each query stays small regardless of history size.
+    With `modified_after`, only days whose accounts were (re)inserted after that timestamp.
+    """
+    last_date = None
+    while True:
+        if modified_after:
+            # Find the changed days first; the embedded filter would otherwise trim their accounts
+            query = (client.table("daily_records").select("record_date, accounts!inner(created_at)")
+                     .gt("accounts.created_at", modified_after))
+        else:
+            query = client.table("daily_records").select(EXPORT_SELECT)
+        query = query.eq("user_id", user_id)
+        if since:
+            query = query.gte("record_date", since)
+        if last_date:
+            query = query.gt("record_date", last_date)
+        page = query.order("record_date").limit(page_size).execute().data
+        if not page:
+            return
+        if modified_after:
+            dates = [record["record_date"] for record in page]
+            yield (client.table("daily_records").select(EXPORT_SELECT).eq("user_id", user_id)
+                   .in_("record_date", dates).order("record_date").execute().data)
+        else:
+            yield page
+        if len(page) < page_size:
+            return
+        last_date = page[-1]["record_date"]
+
+
+def get_latest_change(client, user_id):
+    """
+    Latest accounts.created_at for the user. Every save (run.py upload or the web client)
+    deletes and re-inserts a day's accounts, so this marks the last modification.
+    """
+    latest = (client.table("accounts").select("created_at").eq("user_id", user_id)
+              .order("created_at", desc=True).limit(1).execute().data)
+    return latest[0]["created_at"] if latest else None
+
+
+def get_watermark_file(out, fmt):
+    return out / ".export_watermark" if fmt == "daily" else out.with_name(out.name + ".watermark")
+
+
+def merge_ndjson(existing_file, updates_file, out_file):
+    """
+    Merge two date-sorted NDJSON exports line by line (constant memory).
+    A day present in both is taken from `updates_file`.
+    """
+    def read_days(f):
+        for line in f:
+            if line.strip():
+                yield json.loads(line)["date"], line
+    
+    with open(existing_file) as existing, open(updates_file) as updates, open(out_file, "w") as out:
+        old_days, new_days = read_days(existing), read_days(updates)
+        old_day, new_day = next(old_days, None), next(new_days, None)
+        while old_day or new_day:
+            if new_day and (not old_day or new_day[0] <= old_day[0]):
+                if old_day and old_day[0] == new_day[0]:
+                    old_day = next(old_days, None)
+                out.write(new_day[1])
+                new_day = next(new_days, None)
+            else:
+                out.write(old_day[1])
+                old_day = next(old_days, None)
+
+
+def export_history(config, out, fmt="ndjson", since=None, page_size=100):
+    """
+    Stream the user's history to disk, one page in memory at a time.
+    fmt "ndjson" writes one day per line to `out`; "daily" writes `out`/YYYY-MM-DD.json.
+    since=SINCE_WATERMARK exports only days modified since the last full/incremental export.
+    Partial exports are merged into an existing NDJSON file, replacing days already in it.
+    """
+    watermark_file = get_watermark_file(out, fmt)
+    modified_after = None
+    if since == SINCE_WATERMARK:
+        since = None
+        # Changed days alone would become the whole history if the earlier export is gone
+        has_export = out.is_file() if fmt == "ndjson" else out.is_dir() and any(out.glob("*.json"))
+        if not has_export:
+            print(f"No existing export at {out}, ignoring watermark and exporting all history")
+        elif watermark_file.exists():
+            modified_after = json.loads(watermark_file.read_text()).get("modified_at")
+    
+    client, user_id = sign_in_supabase(config)
+    # Taken before reading, so anything saved during the export is picked up next time
+    latest_change = get_latest_change(client, user_id)
+    if modified_after:
+        print(f"Exporting days modified after {modified_after} to {out} ({fmt})")
+    else:
+        print(f"Exporting {'from ' + since if since else 'all history'} to {out} ({fmt})")
+    
+    if fmt == "daily":
+        out.mkdir(parents=True, exist_ok=True)
+    else:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file; it replaces (or is merged into) `out` once complete
+        temp_file = out.with_name(out.name + ".tmp")
+        ndjson_file = open(temp_file, "w")
+    
+    exported = 0
+    try:
+        for page in iter_daily_records(client, user_id, since, modified_after, page_size):
+            for record in page:
+                day = to_daily_data(record)
+                if fmt == "daily":
+                    with open(out / f"{day['date']}.json", "w") as f:
+                        json.dump(day, f, indent=2)
+                else:
+                    ndjson_file.write(json.dumps(day) + "\n")
+            exported += len(page)
+            if page:
+                print(f"  {exported} days exported (up to {page[-1]['record_date']})")
+    finally:
+        if fmt != "daily":
+            ndjson_file.close()
+    
+    if fmt != "daily":
+        if (since or modified_after) and out.exists():
+            merged_file = out.with_name(out.name + ".merged")
+            merge_ndjson(out, temp_file, merged_file)
+            os.replace(merged_file, out)
+            temp_file.unlink()
+        else:
+            os.replace(temp_file, out)
+    
+    # An explicit --since skips earlier days, so it can't vouch for changes to them
+    if not since and latest_change:
+        watermark_file.write_text(json.dumps({"modified_at": latest_change}))
+    print(f"Exported {exported} days to {out}")
+
+
+def parse_since(value):
+    """argparse type for --since: a YYYY-MM-DD date (or the watermark const, which argparse also passes through)."""
+    if value == SINCE_WATERMARK:
+        return value
+    try:
+        if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+            raise ValueError
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def positive_int(value):
+    """argparse type for --page-size: limit(0) would export nothing and still advance the watermark."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"invalid page size '{value}', expected a positive integer")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fetch bank balances and upload to BankrollTracker")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Save sanitised page snapshots to snapshots/ for replay.py")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    export_parser = subparsers.add_parser("export", help="Export BankrollTracker history to disk")
+    export_parser.add_argument("--format", choices=["ndjson", "daily"], default="ndjson",
+                               help="ndjson: one day per line; daily: one output/-style file per day")
+    export_parser.add_argument("--out", type=Path,
+                               help="Output file (ndjson) or directory (daily). Default: export/")
+    export_parser.add_argument("--since", nargs="?", const=SINCE_WATERMARK, type=parse_since,
+                               help="Only days from this date (YYYY-MM-DD); no value = days changed since last export")
+    export_parser.add_argument("--page-size", type=positive_int, default=100, help="Days per query (default: 100)")
+    return parser
+
+
 def main():
+    args = build_parser().parse_args()
+    
     config = load_config()
+    
+    if args.command == "export":
+        out = args.out or (EXPORT_DIR / "history.ndjson" if args.format == "ndjson" else EXPORT_DIR / "daily")
+        export_history(config, out, args.format, args.since, args.page_size)
+        return
+    
     data = load_today_data()
     
     print(f"=== Bank Balance Automation - {date.today().isoformat()} ===\n")
     
+    total_otp_wait = 0
     for bank in config["banks"]:
         print(f"Processing: {bank['name']} - {bank['holder_name']} ({bank['id']})")
         
-        result = run_bank_script(bank)
+        result = run_bank_script(bank, snapshot=args.snapshot)
         
         if result:
+            otp_wait = result.get("otp_wait_seconds", 0)
+            total_otp_wait += otp_wait
+            if otp_wait:
+                print(f"  OTP/CAPTCHA wait: {otp_wait}s")
+            
             # Get account mapping from config - by last 4 digits of account number
             account_map = {a["account_number"][-4:]: a for a in bank.get("accounts", [])}
             
@@ -234,6 +474,9 @@ def main():
         import time
         time.sleep(5)
     
+    if total_otp_wait:
+        print(f"Total OTP/CAPTCHA wait: {total_otp_wait:.1f}s\n")
+    
     # Ask to upload
     if data["accounts"]:
         response = input("Upload to BankrollTracker? (y/n): ")
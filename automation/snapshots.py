@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Sanitised DOM snapshots of bank pages, for offline extractor replay (see replay.py).
+Recordings call save_snapshot() after each extraction; it's a no-op unless SNAPSHOT_DIR is set.
+"""
+
+import contextlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+
+SNAPSHOT_DIR = Path(__file__).parent / "snapshots"
+
+# Account numbers are 10+ digits; keep the last 4 (that's what run.py matches on)
+ACCOUNT_NUMBER_RE = re.compile(r"\d{6,}(\d{4})")
+STRIP_TAGS_RE = re.compile(r"<(script|noscript|iframe)\b.*?</\1\s*>", re.I | re.S)
+STRIP_VOID_RE = re.compile(r"<(link|meta|base)\b[^>]*>", re.I)
+INPUT_VALUE_RE = re.compile(r'(<input\b[^>]*?\svalue=)("[^"]*"|\'[^\']*\')', re.I)
+
+# Short enough that a missing selector fails fast instead of stalling the replay
+REPLAY_TIMEOUT_MS = 1000
+
+# Concatenate every readable stylesheet, so <link>ed CSS survives sanitising
+COLLECT_CSS_JS = """() => Array.from(document.styleSheets).map(sheet => {
+    try { return Array.from(sheet.cssRules).map(rule => rule.cssText).join("\\n"); }
+    catch (e) { return ""; }
+}).join("\\n")"""
+
+
+def mask_account_numbers(text):
+    return ACCOUNT_NUMBER_RE.sub(lambda m: "X" * (len(m.group(0)) - 4) + m.group(1), text)
+
+
+def sanitize_html(html, secrets=()):
+    """Drop scripts/external resources and form values, mask account numbers and secrets."""
+    html = STRIP_TAGS_RE.sub("", html)
+    html = STRIP_VOID_RE.sub("", html)
+    html = INPUT_VALUE_RE.sub(r'\1""', html)
+    for secret in secrets:
+        if secret:
+            html = html.replace(secret, "REDACTED")
+    return mask_account_numbers(html)
+
+
+def inline_styles(html, css):
+    """Put the page's computed stylesheets into a <style> tag, so visibility-dependent inner_text replays the same."""
+    if not css:
+        return html
+    style = f"<style>{css}</style>"
+    head_end = re.search(r"</head\s*>", html, re.I)
+    if head_end:
+        return html[:head_end.start()] + style + html[head_end.start():]
+    return style + html
+
+
+def open_replay_page(context):
+    """New page for loading snapshots: short locator timeout, no network access."""
+    page = context.new_page()
+    page.set_default_timeout(REPLAY_TIMEOUT_MS)
+    # Snapshots are self-contained; never hit the bank from a replay
+    page.route("**/*", lambda route: route.abort())
+    return page
+
+
+def run_extractor(extractor, page):
+    """Run an extractor with its logging suppressed, returning a JSON-comparable result."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = extractor(page)
+    # Round-trip so tuples etc. compare the same way as the stored JSON
+    return json.loads(json.dumps(result))
+
+
+def sanitize_result(result):
+    """Mask account numbers in an extractor result so it matches the sanitised HTML."""
+    if isinstance(result, str):
+        return mask_account_numbers(result)
+    if isinstance(result, list):
+        return [sanitize_result(item) for item in result]
+    if isinstance(result, dict):
+        return {key: sanitize_result(value) for key, value in result.items()}
+    return result
+
+
+def save_snapshot(page, bank_name, page_name, extractor, live_result):
+    """
+    Save the current page as snapshots/<BANK_ID>/<page_name>.html. expected.json gets
+    the extractor's result on the sanitised HTML, i.e. exactly what replay.py will see.
+    Only runs when SNAPSHOT_DIR is set, and never fails the recording.
+    """
+    root = os.environ.get("SNAPSHOT_DIR")
+    if not root:
+        return
+
+    try:
+        _write_snapshot(Path(root), page, bank_name, page_name, extractor, live_result)
+    except Exception as e:
+        # Snapshots are diagnostics; the balance run must carry on regardless
+        print(f"[{bank_name}] Warning: could not save snapshot {page_name}: {e}")
+
+
+def _write_snapshot(root, page, bank_name, page_name, extractor, live_result):
+    snapshot_dir = root / os.environ.get("BANK_ID", bank_name)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    secrets = (os.environ.get("BANK_USERNAME", ""), os.environ.get("BANK_PASSWORD", ""))
+    html = sanitize_html(inline_styles(page.content(), page.evaluate(COLLECT_CSS_JS)), secrets)
+    (snapshot_dir / f"{page_name}.html").write_text(html, encoding="utf-8")
+
+    replay_page = open_replay_page(page.context)
+    try:
+        replay_page.set_content(html)
+        result = run_extractor(extractor, replay_page)
+    except Exception as e:
+        print(f"[{bank_name}] Warning: snapshot {page_name} fails to replay: {e}")
+        result = None
+    finally:
+        replay_page.close()
+
+    if result is not None and result != sanitize_result(live_result):
+        print(f"[{bank_name}] Warning: snapshot {page_name} replays differently from the live page")
+        print(f"    live:     {json.dumps(sanitize_result(live_result))}")
+        print(f"    snapshot: {json.dumps(result)}")
+
+    expected_file = snapshot_dir / "expected.json"
+    expected = {"bank": bank_name, "pages": {}}
+    if expected_file.exists():
+        with open(expected_file, encoding="utf-8") as f:
+            expected = json.load(f)
+    if result is None:
+        # No baseline: replay.py reports this page as NO EXPECTED
+        expected["pages"].pop(page_name, None)
+    else:
+        expected["pages"][page_name] = result
+    with open(expected_file, "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=2)
+
+    print(f"[{bank_name}] Saved snapshot: {snapshot_dir / page_name}.html")
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Automation scripts are run from automation/, not installed as a package
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,37 @@
+import pytest
+
+from otp_providers import SMS_OTP_PATTERNS, extract_code
+
+
+@pytest.mark.parametrize("sms, expected", [
+    ("Your OTP is 123456", "123456"),
+    ("Your OTP code is 111222", "111222"),
+    ("OTP: 123456 for Rs 100000", "123456"),
+    ("Rs 100000 debited. OTP 654321", "654321"),
+    ("OTP for txn of Rs 100000 is 654321", "654321"),
+    ("OTP for Rs. 5000 txn is 222333", "222333"),
+    ("654321 is your One Time Password for txn of Rs 100000", "654321"),
+    ("Rs 100000 txn. 765432 is your HDFC OTP. Do not share", "765432"),
+    ("Code 999999", "999999"),
+])
+def test_sms_otp_patterns_pick_the_otp(sms, expected):
+    assert extract_code(sms, SMS_OTP_PATTERNS) == expected
+
+
+@pytest.mark.parametrize("sms", [
+    "Rs 100000 debited from A/c XX1234",
+    "INR 250000 spent, ref 123456",
+    "₹100000 credited",
+])
+def test_sms_otp_patterns_never_return_an_amount(sms):
+    assert extract_code(sms, SMS_OTP_PATTERNS) is None
+
+
+def test_extract_code_without_pattern_returns_stripped_text():
+    assert extract_code("  aB3x9\n") == "aB3x9"
+    assert extract_code("   ") is None
+
+
+def test_extract_code_single_pattern():
+    assert extract_code("code: 4321", r"(\d{4})") == "4321"
+    assert extract_code("no digits", r"(\d{4})") is None
@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+import argparse
+
+import run
+from run import SINCE_WATERMARK, build_parser, merge_ndjson, parse_since, to_daily_data
+
+
+def test_export_since_without_value_uses_watermark():
+    args = build_parser().parse_args(["export", "--since"])
+    assert args.since == SINCE_WATERMARK
+
+
+def test_export_since_with_date():
+    args = build_parser().parse_args(["export", "--since", "2026-01-03"])
+    assert args.since == "2026-01-03"
+
+
+def test_export_without_since_exports_everything():
+    args = build_parser().parse_args(["export"])
+    assert args.command == "export"
+    assert args.since is None
+
+
+class FakeQuery:
+    """Minimal stand-in for the supabase query builder, over in-memory daily_records."""
+
+    def __init__(self, table, days):
+        self.table, self.days, self.filters, self.count = table, days, [], None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def gt(self, key, value):
+        if key == "accounts.created_at":
+            self.filters.append(lambda r: any(a["created_at"] > value for a in r["accounts"]))
+        else:
+            self.filters.append(lambda r: r[key] > value)
+        return self
+
+    def gte(self, key, value):
+        self.filters.append(lambda r: r[key] >= value)
+        return self
+
+    def in_(self, key, values):
+        self.filters.append(lambda r: r[key] in values)
+        return self
+
+    def order(self, key, desc=False):
+        self.desc = desc
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def execute(self):
+        if self.table == "accounts":
+            rows = sorted((a for r in self.days for a in r["accounts"]),
+                          key=lambda a: a["created_at"], reverse=self.desc)
+        else:
+            rows = sorted(self.days, key=lambda r: r["record_date"])
+        rows = [r for r in rows if all(f(r) for f in self.filters)][:self.count]
+        return type("Response", (), {"data": rows})
+
+
+def make_day(record_date, balance, created_at):
+    return {"record_date": record_date, "accounts": [{
+        "holder_name": "User1", "bank_name": "HDFC", "account_number": "1234",
+        "balance": balance, "fixed_deposits": [], "created_at": created_at,
+    }]}
+
+
+def fake_client(monkeypatch, days):
+    client = type("Client", (), {"table": lambda self, name: FakeQuery(name, days)})()
+    monkeypatch.setattr(run, "sign_in_supabase", lambda config: (client, "user"))
+
+
+def read_balances(out):
+    return {json.loads(line)["date"]: json.loads(line)["accounts"][0]["balance"]
+            for line in out.read_text().splitlines()}
+
+
+def test_watermark_export_without_existing_output_exports_everything(tmp_path, monkeypatch):
+    days = [make_day(f"2026-01-0{d}", d, f"2026-02-01T00:00:0{d}+00:00") for d in range(1, 4)]
+    fake_client(monkeypatch, days)
+    out = tmp_path / "history.ndjson"
+    run.export_history({}, out, "ndjson", None)
+    out.unlink()
+
+    days.append(make_day("2026-01-04", 4, "2026-02-01T00:00:09+00:00"))
+    run.export_history({}, out, "ndjson", SINCE_WATERMARK)
+    assert read_balances(out) == {"2026-01-01": 1, "2026-01-02": 2, "2026-01-03": 3, "2026-01-04": 4}
+
+
+@pytest.mark.parametrize("page_size", ["0", "-5", "ten"])
+def test_export_rejects_non_positive_page_size(page_size):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["export", "--page-size", page_size])
+
+
+def test_export_page_size():
+    assert build_parser().parse_args(["export", "--page-size", "50"]).page_size == 50
+
+
+def write_ndjson(path, days):
+    path.write_text("".join(json.dumps({"date": date, "accounts": [], "v": v}) + "\n" for date, v in days))
+
+
+def test_merge_ndjson_new_day_wins_and_stays_sorted(tmp_path):
+    existing, updates, out = tmp_path / "existing", tmp_path / "updates", tmp_path / "out"
+    write_ndjson(existing, [("2026-01-01", "old"), ("2026-01-02", "old"), ("2026-01-04", "old")])
+    write_ndjson(updates, [("2026-01-02", "new"), ("2026-01-03", "new"), ("2026-01-05", "new")])
+    merge_ndjson(existing, updates, out)
+    merged = [(day["date"], day["v"]) for day in map(json.loads, out.read_text().splitlines())]
+    assert merged == [("2026-01-01", "old"), ("2026-01-02", "new"), ("2026-01-03", "new"),
+                      ("2026-01-04", "old"), ("2026-01-05", "new")]
+
+
+def test_merge_ndjson_with_no_updates_keeps_file(tmp_path):
+    existing, updates, out = tmp_path / "existing", tmp_path / "updates", tmp_path / "out"
+    write_ndjson(existing, [("2026-01-01", "old")])
+    updates.write_text("")
+    merge_ndjson(existing, updates, out)
+    assert out.read_text() == existing.read_text()
+
+
+def test_to_daily_data_matches_output_format():
+    record = make_day("2026-02-21", 150000, "2026-02-21T10:00:00+00:00")
+    record["accounts"][0]["fixed_deposits"] = [{"principal": 100000, "maturity_date": "2027-01-15"}]
+    assert to_daily_data(record) == {"date": "2026-02-21", "accounts": [{
+        "holder_name": "User1", "bank_name": "HDFC", "account_number": "1234", "balance": 150000,
+        "fds": [{"principal": 100000, "maturity_date": "2027-01-15"}],
+    }]}
+
+
+@pytest.mark.parametrize("value", ["2026-1-3", "2026-13-01", "03-01-2026", "yesterday"])
+def test_parse_since_rejects_bad_dates(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_since(value)
+
+
+def test_watermark_export_reexports_edited_days(tmp_path, monkeypatch):
+    days = [make_day(f"2026-01-0{d}", d, f"2026-02-01T00:00:0{d}+00:00") for d in range(1, 4)]
+    fake_client(monkeypatch, days)
+    out = tmp_path / "history.ndjson"
+    run.export_history({}, out, "ndjson", None)
+
+    # Re-upload of an old day: its accounts are deleted and re-inserted
+    days[0] = make_day("2026-01-01", 100, "2026-02-01T00:00:08+00:00")
+    run.export_history({}, out, "ndjson", SINCE_WATERMARK)
+    assert read_balances(out) == {"2026-01-01": 100, "2026-01-02": 2, "2026-01-03": 3}
+    assert len(out.read_text().splitlines()) == 3
@@ -0,0 +1,32 @@
+from snapshots import sanitize_html, sanitize_result, save_snapshot
+
+
+class BrokenPage:
+    def content(self):
+        raise RuntimeError("Target page, context or browser has been closed")
+
+
+def test_save_snapshot_never_raises(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    save_snapshot(BrokenPage(), "PNB", "summary", lambda page: {}, {})
+    assert "could not save snapshot summary" in capsys.readouterr().out
+
+
+def test_save_snapshot_is_noop_without_snapshot_dir(monkeypatch):
+    monkeypatch.delenv("SNAPSHOT_DIR", raising=False)
+    save_snapshot(BrokenPage(), "PNB", "summary", lambda page: {}, {})
+
+
+def test_sanitize_html_strips_scripts_values_and_secrets():
+    html = ('<html><head><script>var token = 1;</script><link rel="stylesheet" href="a.css"></head>'
+            '<body><input value="myuser"><span>3877000100116598</span> myuser ₹1,37,905.18</body></html>')
+    clean = sanitize_html(html, ("myuser", "secretpw"))
+    assert "<script" not in clean and "<link" not in clean
+    assert "myuser" not in clean
+    assert "XXXXXXXXXXXX6598" in clean
+    assert "₹1,37,905.18" in clean
+
+
+def test_sanitize_result_masks_like_the_html():
+    result = {"accounts": [{"account_number": "3877000100116598", "balance": 137905}]}
+    assert sanitize_result(result) == {"accounts": [{"account_number": "XXXXXXXXXXXX6598", "balance": 137905}]}